@@ -0,0 +1,264 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import sounddevice as sd
+
+import scheduling
+from hear.devices import get_device_manager
+
+
+def burn_cpu(stop_event, cores=None):
+    """Busy loop standing in for ollama/paroli inference load"""
+    if cores:
+        os.sched_setaffinity(0, cores)
+    x = 0
+    while not stop_event.is_set():
+        for i in range(10000):
+            x += i * i
+
+
+def measure_underruns(duration, blocksize, samplerate=16000):
+    """
+    Run full-duplex capture and playback streams and count xruns.
+
+    Returns:
+        dict: Input overflow and output underflow callback counts
+    """
+    manager = get_device_manager()
+    input_device = manager.input_device()
+    output_device = manager.output_device()
+    input_rate = input_device.pick_samplerate(samplerate)
+    output_rate = output_device.pick_samplerate(samplerate)
+    counts = {"input_overflows": 0, "output_underflows": 0, "callbacks": 0}
+
+    # A short tone keeps the playback path doing real work
+    tone = (0.05 * np.sin(2 * np.pi * 440 * np.arange(blocksize) / output_rate)).astype(np.float32)
+
+    def input_callback(indata, frames, t, status):
+        scheduling.apply_stage_once("capture")
+        counts["callbacks"] += 1
+        if status.input_overflow:
+            counts["input_overflows"] += 1
+
+    def output_callback(outdata, frames, t, status):
+        scheduling.apply_stage_once("playback")
+        if status.output_underflow:
+            counts["output_underflows"] += 1
+        outdata[:, 0] = tone[:frames]
+
+    with sd.InputStream(device=input_device.index, samplerate=input_rate, channels=1,
+                        blocksize=blocksize, dtype=np.float32, callback=input_callback), \
+         sd.OutputStream(device=output_device.index, samplerate=output_rate, channels=1,
+                         blocksize=blocksize, dtype=np.float32, callback=output_callback):
+        time.sleep(duration)
+
+    return counts
+
+
+def measure_turns(prompt, turns, wav_file=None, play=False):
+    """
+    Time full turns against the running ollama and paroli servers.
+
+    Mirrors StreamToSpeech: the main thread reads the LLM stream and a single
+    "tts" thread synthesizes (and optionally plays) sentences one at a time.
+    With wav_file, each turn starts by transcribing it, and its text replaces
+    prompt.
+
+    Returns:
+        list: (time to first audio, total turn time) per turn, in seconds.
+            First audio is when sentence 1 is synthesized.
+    """
+    from nltk.tokenize import sent_tokenize
+
+    from hear.asr import transcribe_audio
+    from llm.luna import stream_luna2
+    from speak.speak import TextToSpeechStreamer
+
+    tts_streamer = TextToSpeechStreamer()
+    results = []
+    scheduling.apply_stage("llm")
+
+    for _ in range(turns):
+        start = time.perf_counter()
+        if wav_file:
+            # transcribe_audio deletes its input, so hand it a copy
+            fd, wav_copy = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            shutil.copyfile(wav_file, wav_copy)
+            prompt = transcribe_audio(wav_copy) or prompt
+
+        sentences = queue.Queue()
+        first_audio = []
+
+        def speech_worker():
+            scheduling.apply_stage("tts")
+            first = True
+            while True:
+                sentence = sentences.get()
+                if sentence is None:
+                    break
+                audio = tts_streamer.synthesize_bytes(sentence)
+                if first:
+                    first_audio.append(time.perf_counter() - start if audio else None)
+                    first = False
+                if audio and play:
+                    tts_streamer.play_audio_bytes(audio)
+
+        worker = threading.Thread(target=speech_worker)
+        worker.start()
+        try:
+            text_accumulator = ""
+            for chunk in stream_luna2(prompt):
+                content = chunk.message.content
+                text_accumulator += content
+                if any(punct in content for punct in '.!?'):
+                    complete = sent_tokenize(text_accumulator)
+                    for sentence in complete[:-1]:
+                        if sentence.strip():
+                            sentences.put(sentence.strip())
+                    if len(complete) > 1:
+                        text_accumulator = complete[-1]
+            for sentence in sent_tokenize(text_accumulator):
+                if sentence.strip():
+                    sentences.put(sentence.strip())
+        finally:
+            sentences.put(None)
+            worker.join()
+
+        total = time.perf_counter() - start
+        results.append((first_audio[0] if first_audio else None, total))
+    return results
+
+
+def percentile(values, q):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return float(np.percentile(values, q))
+
+
+def run_child(args):
+    if args.policy == "none":
+        scheduling.set_policy({})
+    else:
+        scheduling.set_policy(scheduling.load_policy(args.policy))
+
+    stop_event = multiprocessing.Event()
+    burners = [multiprocessing.Process(target=burn_cpu, args=(stop_event, args.load_cores))
+               for _ in range(args.load)]
+    for burner in burners:
+        burner.start()
+
+    try:
+        result = measure_underruns(args.duration, args.blocksize)
+        if args.prompt:
+            try:
+                turns = measure_turns(args.prompt, args.turns,
+                                      wav_file=args.wav, play=args.play)
+                first_audio = [t[0] for t in turns]
+                totals = [t[1] for t in turns]
+                result["first_audio_p50"] = percentile(first_audio, 50)
+                result["first_audio_p95"] = percentile(first_audio, 95)
+                result["turn_p50"] = percentile(totals, 50)
+                result["turn_p95"] = percentile(totals, 95)
+            except Exception as e:
+                print(f"Skipping turn latency, servers unavailable: {e}")
+    finally:
+        stop_event.set()
+        for burner in burners:
+            burner.join()
+
+    # Unique messages, so the parent can flag a policy that silently did nothing
+    result["policy_failures"] = sorted(set(scheduling.failures()))
+
+    # Last line of output is read back by the parent
+    print(json.dumps(result))
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value * 1000:.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare audio xruns and turn latency with and without a scheduling policy"
+    )
+    parser.add_argument("--config", default="sched.example.json",
+                        help="Scheduling policy to compare against no policy")
+    parser.add_argument("--duration", type=float, default=30,
+                        help="Seconds of full-duplex audio per run")
+    parser.add_argument("--blocksize", type=int, default=256,
+                        help="Frames per audio callback; smaller is stricter")
+    parser.add_argument("--load", type=int, default=multiprocessing.cpu_count(),
+                        help="CPU burner processes competing with the pipeline")
+    parser.add_argument("--load-cores", default=None,
+                        type=lambda value: [int(core) for core in value.split(",")],
+                        help="Comma-separated cores for the burners, e.g. where ollama is pinned")
+    parser.add_argument("--prompt", default=None,
+                        help="Also time LLM + TTS turns with this prompt (needs ollama and paroli)")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--wav", default=None,
+                        help="Transcribe this WAV at the start of each turn to include ASR")
+    parser.add_argument("--play", action="store_true",
+                        help="Play synthesized sentences to include the playback stage")
+    parser.add_argument("--policy", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.policy is not None:
+        run_child(args)
+        return
+
+    # Each policy runs in a fresh process: affinity and priority cannot be undone
+    rows = []
+    for label, policy in (("no policy", "none"), (args.config, args.config)):
+        print(f"Running with {label}...")
+        command = [sys.executable, __file__, "--policy", policy,
+                   "--duration", str(args.duration),
+                   "--blocksize", str(args.blocksize),
+                   "--load", str(args.load),
+                   "--turns", str(args.turns)]
+        if args.prompt:
+            command += ["--prompt", args.prompt]
+        if args.load_cores:
+            command += ["--load-cores", ",".join(str(core) for core in args.load_cores)]
+        if args.wav:
+            command += ["--wav", args.wav]
+        if args.play:
+            command.append("--play")
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        lines = output.strip().splitlines()
+        for line in lines[:-1]:
+            print(f"  {line}")
+        rows.append((label, json.loads(lines[-1])))
+
+    print()
+    print(f"{'policy':<24}{'callbacks':>10}{'in xrun':>9}{'out xrun':>10}"
+          f"{'1st audio p50':>15}{'p95':>9}{'turn p50':>10}{'p95':>9}")
+    for label, result in rows:
+        print(f"{label:<24}{result['callbacks']:>10}{result['input_overflows']:>9}"
+              f"{result['output_underflows']:>10}"
+              f"{format_seconds(result.get('first_audio_p50')):>15}"
+              f"{format_seconds(result.get('first_audio_p95')):>9}"
+              f"{format_seconds(result.get('turn_p50')):>10}"
+              f"{format_seconds(result.get('turn_p95')):>9}")
+
+    for label, result in rows:
+        if result["policy_failures"]:
+            print(f"\nWARNING: {label} was only partly applied; its numbers do not "
+                  f"reflect the full policy (realtime and negative nice need root or CAP_SYS_NICE):")
+            for message in result["policy_failures"]:
+                print(f"  {message}")
+
+
+if __name__ == "__main__":
+    main()
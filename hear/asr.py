@@ -0,0 +1,43 @@
+import os
+import subprocess
+
+from scheduling import run_in_stage
+
+# Kept free of audio-device imports so headless hosts (see serve/server.py)
+# can transcribe without PortAudio installed.
+
+def clean_transcription(output):
+    """Remove the tokens and tags Whisper prints around the text"""
+    output = output.replace("[50257, 50362]", "").strip()
+    output = output.replace("<|startoftranscript|>", "").strip()
+    output = output.replace("<|notimestamps|>", "").strip()
+    return output
+
+def transcribe_audio(wav_file):
+    """
+    Transcribe the audio file using the specified command.
+    Deletes the WAV file after transcription.
+    
+    Args:
+        wav_file (str): Path to the WAV file
+    """
+    command = ["python", "-m", "useful_transformers.transcribe_wav", wav_file]
+    try:
+        # Core pinning and priority come from the "asr" scheduling stage
+        result = run_in_stage("asr", command, check=True,
+                              capture_output=True, text=True)
+        
+        output = clean_transcription(result.stdout)
+        
+        # Delete the WAV file
+        os.remove(wav_file)
+        print(f"Deleted temporary file: {wav_file}")
+        
+        return output
+    except subprocess.CalledProcessError as e:
+        print(f"Error during transcription: {e}")
+        # Delete the WAV file even if transcription fails
+        if os.path.exists(wav_file):
+            os.remove(wav_file)
+            print(f"Deleted temporary file: {wav_file}")
+        return None
@@ -0,0 +1,52 @@
+import contextlib
+import io
+import json
+import sys
+
+from hear.asr import clean_transcription
+
+# Long-lived transcription process: loads the Whisper model onto the NPU once,
+# then reads one JSON list of WAV paths per line on stdin and answers each with
+# one JSON list of transcriptions (null on failure) on stdout.
+#
+# Run from the repo root: python -m hear.asr_worker
+
+
+def load_model():
+    """Load the model once; this is the cost the CLI pays on every file"""
+    from useful_transformers.whisper import WhisperModel
+    return WhisperModel()
+
+
+def transcribe(model, wav_file):
+    from useful_transformers.whisper import decode_wav_file
+
+    # The decoder prints tokens as it goes; keep them off the reply channel
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured):
+        text = decode_wav_file(wav_file, model)
+    if not isinstance(text, str):
+        text = captured.getvalue()
+    return clean_transcription(text)
+
+
+def main():
+    reply = sys.stdout
+    model = load_model()
+    reply.write(json.dumps({"ready": True}) + "\n")
+    reply.flush()
+
+    for line in sys.stdin:
+        results = []
+        for wav_file in json.loads(line):
+            try:
+                results.append(transcribe(model, wav_file))
+            except Exception as e:
+                print(f"Error transcribing {wav_file}: {e}", file=sys.stderr)
+                results.append(None)
+        reply.write(json.dumps(results) + "\n")
+        reply.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import os
+
+import sounddevice as sd
+
+# Name fragments tried in order, matched case-insensitively against device names
+DEFAULT_INPUT_PATTERNS = ("yeti",)
+DEFAULT_OUTPUT_PATTERNS = ()
+
+# Rates probed when a device is resolved, in addition to its default rate
+CANDIDATE_SAMPLE_RATES = (16000, 22050, 44100, 48000)
+
+# ALSA's card list changes whenever a sound card is plugged or unplugged
+ASOUND_CARDS = "/proc/asound/cards"
+
+
+class DeviceNotFoundError(Exception):
+    pass
+
+
+class AudioDevice:
+    """A resolved audio device: PortAudio index, name and supported rates"""
+
+    def __init__(self, index, name, default_samplerate, supported_rates):
+        self.index = index
+        self.name = name
+        self.default_samplerate = default_samplerate
+        self.supported_rates = supported_rates
+
+    def pick_samplerate(self, preferred):
+        """Return preferred if the device supports it, else the default rate"""
+        if preferred in self.supported_rates:
+            return preferred
+        return self.default_samplerate
+
+
+class AudioDeviceManager:
+    """
+    Resolves input/output devices once and caches the result.
+
+    Device enumeration is slow on PortAudio/ALSA, so it is kept off the
+    per-turn path: devices are looked up on first use, then served from the
+    cache until a stream fails (see invalidate) or a hot-plug is detected.
+    """
+
+    def __init__(self, input_patterns=DEFAULT_INPUT_PATTERNS,
+                 output_patterns=DEFAULT_OUTPUT_PATTERNS):
+        """
+        Args:
+            input_patterns (tuple): Name fragments for the input device
+            output_patterns (tuple): Name fragments for the output device;
+                empty means the system default
+        """
+        self.input_patterns = tuple(p.lower() for p in input_patterns)
+        self.output_patterns = tuple(p.lower() for p in output_patterns)
+        self._input = None
+        self._output = None
+        self._signature = None
+
+    def _hotplug_signature(self):
+        """Cheap fingerprint of attached sound cards, None if unavailable"""
+        try:
+            with open(ASOUND_CARDS) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _check_hotplug(self):
+        signature = self._hotplug_signature()
+        if signature != self._signature:
+            if self._signature is not None:
+                print("Audio devices changed, refreshing")
+                self.refresh()
+            self._signature = signature
+
+    def refresh(self):
+        """Drop cached devices and make PortAudio rescan on next lookup"""
+        self._input = None
+        self._output = None
+        # PortAudio only enumerates devices at initialisation
+        sd._terminate()
+        sd._initialize()
+
+    def invalidate(self):
+        """Call after a stream fails to open; forces a fresh lookup"""
+        self.refresh()
+        self._signature = self._hotplug_signature()
+
+    def _resolve(self, patterns, kind):
+        channels_key = f"max_{kind}_channels"
+        devices = sd.query_devices()
+
+        index = None
+        for pattern in patterns:
+            for i, device in enumerate(devices):
+                if pattern in device["name"].lower() and device[channels_key] > 0:
+                    index = i
+                    break
+            if index is not None:
+                break
+
+        if index is None:
+            if patterns:
+                raise DeviceNotFoundError(
+                    f"No {kind} device matching {', '.join(patterns)}"
+                )
+            index = sd.default.device[0 if kind == "input" else 1]
+            if index is None or index < 0:
+                raise DeviceNotFoundError(f"No default {kind} device")
+
+        info = sd.query_devices(index, kind)
+        default_samplerate = int(info["default_samplerate"])
+        check = sd.check_input_settings if kind == "input" else sd.check_output_settings
+
+        supported_rates = {default_samplerate}
+        for rate in CANDIDATE_SAMPLE_RATES:
+            try:
+                check(device=index, samplerate=rate, channels=1)
+                supported_rates.add(rate)
+            except Exception:
+                pass
+
+        device = AudioDevice(index, info["name"], default_samplerate, sorted(supported_rates))
+        print(f"Using {kind} device {index}: {device.name} "
+              f"(rates: {', '.join(str(r) for r in device.supported_rates)} Hz)")
+        return device
+
+    def input_device(self):
+        """Return the cached input device, resolving it if needed"""
+        self._check_hotplug()
+        if self._input is None:
+            self._input = self._resolve(self.input_patterns, "input")
+        return self._input
+
+    def output_device(self):
+        """Return the cached output device, resolving it if needed"""
+        self._check_hotplug()
+        if self._output is None:
+            self._output = self._resolve(self.output_patterns, "output")
+        return self._output
+
+
+_default_manager = None
+
+
+def get_device_manager():
+    """Return the process-wide device manager"""
+    global _default_manager
+    if _default_manager is None:
+        # Comma-separated name fragments, e.g. LUNA_INPUT_DEVICE=yeti,usb
+        input_patterns = os.environ.get("LUNA_INPUT_DEVICE")
+        output_patterns = os.environ.get("LUNA_OUTPUT_DEVICE")
+        _default_manager = AudioDeviceManager(
+            input_patterns=input_patterns.split(",") if input_patterns else DEFAULT_INPUT_PATTERNS,
+            output_patterns=output_patterns.split(",") if output_patterns else DEFAULT_OUTPUT_PATTERNS,
+        )
+    return _default_manager
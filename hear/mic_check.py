@@ -1,13 +1,16 @@
-import pyaudio
+from hear.devices import DeviceNotFoundError, get_device_manager
+from hear.main import list_audio_devices
 
-p = pyaudio.PyAudio()
-print(str(p.get_device_count()))
-for i in range(1,p.get_device_count()):
-    dev = p.get_device_info_by_index(i)
-    if "USB" in dev['name']:
-        print(f"Device {i}: {dev['name']}")
-        print(f"  Max Input Channels: {dev['maxInputChannels']}")
-        print(f"  Default Sample Rate: {dev['defaultSampleRate']}")
-        print(f"  Supported Sample Rates: {dev['supportedSampleRates']}")
+# Run from the repo root: python -m hear.mic_check
+list_audio_devices()
 
-p.terminate()
+manager = get_device_manager()
+for kind, lookup in (("input", manager.input_device), ("output", manager.output_device)):
+    try:
+        device = lookup()
+    except DeviceNotFoundError as e:
+        print(f"No {kind} device: {e}")
+        continue
+    print(f"Device {device.index}: {device.name}")
+    print(f"  Default Sample Rate: {device.default_samplerate}")
+    print(f"  Supported Sample Rates: {device.supported_rates}")
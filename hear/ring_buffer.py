@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Preallocated single-producer/single-consumer ring buffer for audio frames.
+
+    The producer (the sounddevice callback) only ever advances the write
+    position and the consumer only ever advances the read position, so no
+    lock is needed between the two threads. Memory is allocated once up
+    front; when the buffer is full, incoming frames are dropped and counted
+    as overflow instead of growing the buffer.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        """
+        Args:
+            capacity (int): Maximum number of frames held at once
+            channels (int): Number of audio channels per frame
+            dtype: numpy dtype of the samples
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.channels = channels
+        self._buffer = np.zeros((capacity, channels), dtype=dtype)
+        # Monotonic frame counters; positions in the buffer are taken modulo capacity
+        self._write_count = 0
+        self._read_count = 0
+        self.overflow_frames = 0
+
+    def __len__(self):
+        """Number of frames available to read"""
+        return self._write_count - self._read_count
+
+    def write(self, indata):
+        """
+        Copy a block of frames into the buffer. Producer side only.
+
+        Args:
+            indata (np.ndarray): Block of shape (frames, channels)
+
+        Returns:
+            int: Number of frames written; the rest were dropped as overflow
+        """
+        frames = len(indata)
+        free = self.capacity - (self._write_count - self._read_count)
+        count = min(frames, free)
+        if count < frames:
+            self.overflow_frames += frames - count
+        if count == 0:
+            return 0
+
+        start = self._write_count % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = indata[:first]
+        if count > first:
+            self._buffer[:count - first] = indata[first:count]
+
+        # Publish only after the data is in place
+        self._write_count += count
+        return count
+
+    def read(self, max_frames=None):
+        """
+        Copy out and consume available frames. Consumer side only.
+
+        Args:
+            max_frames (int): Upper bound on frames to read, defaults to all
+
+        Returns:
+            np.ndarray: Frames of shape (n, channels)
+        """
+        available = self._write_count - self._read_count
+        count = available if max_frames is None else min(available, max_frames)
+
+        start = self._read_count % self.capacity
+        first = min(count, self.capacity - start)
+        out = np.empty((count, self.channels), dtype=self._buffer.dtype)
+        out[:first] = self._buffer[start:start + first]
+        if count > first:
+            out[first:] = self._buffer[:count - first]
+
+        self._read_count += count
+        return out
@@ -1,9 +1,13 @@
 from hear.main import listen
 from llm.luna import stream_luna2
 from speak.speak import StreamToSpeech
+from scheduling import apply_stage
 speaker = StreamToSpeech()
 transcription = listen()
 
+# The main thread consumes the ollama stream from here on
+apply_stage("llm")
+
 stream = stream_luna2(transcription=transcription)
 
 speaker.process_stream(stream)
@@ -0,0 +1,170 @@
+import json
+import os
+import subprocess
+import threading
+
+# Pipeline stages a policy can be applied to
+STAGES = ("capture", "asr", "llm", "tts", "playback")
+
+# Matches the previous hard-coded `taskset -c 4-7` for ASR and leaves every
+# other stage alone. See sched.example.json for a full big.LITTLE placement.
+DEFAULT_POLICY = {
+    "asr": {"cores": [4, 5, 6, 7]},
+}
+
+_policy = None
+_applied = set()
+# Messages for settings that could not be applied, e.g. realtime without root
+_failures = []
+_lock = threading.Lock()
+
+
+def load_policy(path=None):
+    """
+    Load the scheduling policy.
+
+    Each stage maps to an optional dict with:
+        cores (list): CPU cores the stage may run on
+        nice (int): Nice value, lower is higher priority
+        realtime (int): SCHED_FIFO priority (1-99), overrides nice
+
+    Args:
+        path (str): JSON policy file, defaults to $LUNA_SCHED_CONFIG
+
+    Returns:
+        dict: Stage name to settings
+    """
+    path = path or os.environ.get("LUNA_SCHED_CONFIG")
+    if not path:
+        return dict(DEFAULT_POLICY)
+
+    with open(path) as f:
+        policy = json.load(f)
+    unknown = set(policy) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages in {path}: {', '.join(sorted(unknown))}")
+    return policy
+
+
+def get_policy():
+    """Return the process-wide policy, loading it on first use"""
+    global _policy
+    if _policy is None:
+        _policy = load_policy()
+    return _policy
+
+
+def set_policy(policy):
+    """Replace the process-wide policy"""
+    global _policy
+    _policy = policy
+    _applied.clear()
+    _failures.clear()
+
+
+def failures():
+    """Return messages for policy settings that could not be applied so far"""
+    return list(_failures)
+
+
+def _apply(stage, target, report):
+    """Apply the policy for stage to the thread or process with id target"""
+    def warn(message):
+        _failures.append(message)
+        if report:
+            print(message)
+
+    settings = get_policy().get(stage)
+    if not settings:
+        return
+
+    cores = settings.get("cores")
+    if cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(target, cores)
+        except OSError as e:
+            warn(f"Could not pin {stage} to cores {cores}: {e}")
+
+    realtime = settings.get("realtime")
+    if realtime and hasattr(os, "sched_setscheduler"):
+        try:
+            os.sched_setscheduler(target, os.SCHED_FIFO, os.sched_param(realtime))
+            return
+        except OSError as e:
+            warn(f"Could not set realtime priority {realtime} for {stage}: {e}")
+
+    nice = settings.get("nice")
+    if nice is not None and hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, target, nice)
+        except OSError as e:
+            warn(f"Could not set nice {nice} for {stage}: {e}")
+
+
+def apply_stage(stage, report=True):
+    """
+    Apply the policy for stage to the calling thread.
+
+    On Linux, affinity, nice and scheduler class are per thread, so this must
+    run on the thread doing the stage's work. Child processes are handled by
+    run_in_stage. Settings the process lacks permission for are skipped.
+
+    Args:
+        stage (str): One of STAGES
+        report (bool): Print settings that could not be applied
+    """
+    _apply(stage, threading.get_native_id(), report)
+
+
+def apply_stage_once(stage):
+    """
+    Apply the policy for stage to the calling thread the first time it is seen.
+
+    Meant for callbacks that run repeatedly on a thread we do not own, such as
+    the PortAudio audio thread.
+    """
+    key = (stage, threading.get_native_id())
+    if key in _applied:
+        return
+    with _lock:
+        if key in _applied:
+            return
+        _applied.add(key)
+    apply_stage(stage)
+
+
+def apply_to_process(stage, pid):
+    """
+    Apply the policy for stage to an already running child process.
+
+    Used instead of a preexec_fn, which can deadlock when the parent has
+    other threads running. Threads the child creates afterwards inherit it.
+    """
+    _apply(stage, pid, report=True)
+
+
+def run_in_stage(stage, args, input=None, check=False, capture_output=False, **kwargs):
+    """
+    Like subprocess.run, with the policy for stage applied to the child.
+
+    The policy is applied from the parent once the child has started, rather
+    than in a preexec_fn, which can deadlock when the parent has other
+    threads running. Threads the child creates afterwards inherit it.
+    """
+    if capture_output:
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+
+    with subprocess.Popen(args, **kwargs) as process:
+        apply_to_process(stage, process.pid)
+        try:
+            stdout, stderr = process.communicate(input)
+        except BaseException:
+            process.kill()
+            raise
+
+    if check and process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import glob
+import os
+import time
+import wave
+
+from serve import protocol
+
+# 20 ms of 16 kHz int16 audio per frame, like a live microphone stream
+CHUNK_BYTES = protocol.SAMPLE_RATE // 50 * protocol.SAMPLE_WIDTH
+
+
+def load_wav(path):
+    """Read a 16 kHz mono int16 WAV file as raw PCM"""
+    with wave.open(path, "rb") as wav:
+        if (wav.getframerate() != protocol.SAMPLE_RATE
+                or wav.getnchannels() != 1
+                or wav.getsampwidth() != protocol.SAMPLE_WIDTH):
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit PCM")
+        return wav.readframes(wav.getnframes())
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def run_client(client_id, host, port, clips, turns, realtime, results):
+    """
+    Simulate one satellite device sending utterances back to back.
+
+    Records, per turn, the delay from the END frame to the transcription,
+    to the first audio frame and to DONE.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for turn in range(turns):
+            pcm = clips[(client_id + turn) % len(clips)]
+            for offset in range(0, len(pcm), CHUNK_BYTES):
+                writer.write(protocol.encode_frame(protocol.AUDIO_IN, pcm[offset:offset + CHUNK_BYTES]))
+                await writer.drain()
+                if realtime:
+                    await asyncio.sleep(0.02)
+            writer.write(protocol.encode_frame(protocol.END))
+            await writer.drain()
+
+            start = time.perf_counter()
+            record = {"client": client_id, "text": None, "first_audio": None, "error": None}
+            while True:
+                kind, payload = await protocol.read_frame(reader)
+                elapsed = time.perf_counter() - start
+                if kind == protocol.TEXT and record["text"] is None:
+                    record["text"] = elapsed
+                elif kind == protocol.AUDIO_OUT and record["first_audio"] is None:
+                    record["first_audio"] = elapsed
+                elif kind == protocol.ERROR:
+                    record["error"] = payload.decode(errors="replace")
+                elif kind == protocol.DONE:
+                    record["done"] = elapsed
+                    break
+            results.append(record)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value * 1000:.0f} ms"
+
+
+async def run(args):
+    paths = sorted(glob.glob(os.path.join(args.audio, "*.wav"))) if os.path.isdir(args.audio) else [args.audio]
+    if not paths:
+        raise SystemExit(f"No WAV files found in {args.audio}")
+    clips = [load_wav(path) for path in paths]
+    print(f"Loaded {len(clips)} clips, starting {args.clients} clients x {args.turns} turns")
+
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(i, args.host, args.port, clips, args.turns, args.realtime, results)
+        for i in range(args.clients)
+    ))
+    wall = time.perf_counter() - start
+
+    errors = [r for r in results if r["error"]]
+    print(f"\n{len(results)} turns in {wall:.1f}s ({len(results) / wall:.2f} turns/s), "
+          f"{len(errors)} errors")
+    print(f"{'':<14}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for label, key in (("transcription", "text"), ("first audio", "first_audio"), ("turn done", "done")):
+        values = [r[key] for r in results if r.get(key) is not None]
+        print(f"{label:<14}" + "".join(
+            f"{format_seconds(percentile(values, q)):>10}" for q in (50, 95, 99, 100)
+        ))
+    for record in errors[:5]:
+        print(f"client {record['client']}: {record['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate concurrent voice clients against the Luna server"
+    )
+    parser.add_argument("audio", help="16 kHz mono WAV file or directory of them "
+                                      "(see download_audio_16khz.py)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8849)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=3, help="Utterances per client")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Pace audio at 1x speed instead of sending as fast as possible")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
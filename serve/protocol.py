@@ -0,0 +1,45 @@
+import struct
+
+# Every frame is a 1-byte type and a 4-byte big-endian payload length,
+# followed by the payload.
+HEADER = struct.Struct("!BI")
+
+# Client -> server
+AUDIO_IN = 1    # 16 kHz mono int16 PCM
+END = 2         # End of utterance, starts a turn
+
+# Server -> client
+TEXT = 3        # UTF-8 transcription of the utterance
+AUDIO_OUT = 4   # One synthesized sentence, encoded as returned by paroli
+DONE = 5        # Turn finished; always the last frame of a turn
+ERROR = 6       # UTF-8 error message; no more audio follows, then DONE
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+MAX_PAYLOAD = 1 << 20
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_frame(kind, payload=b""):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader):
+    """
+    Read one frame from an asyncio stream.
+
+    Raises asyncio.IncompleteReadError when the peer closes the connection.
+
+    Returns:
+        tuple: (kind, payload)
+    """
+    header = await reader.readexactly(HEADER.size)
+    kind, length = HEADER.unpack(header)
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame of {length} bytes exceeds {MAX_PAYLOAD}")
+    payload = await reader.readexactly(length) if length else b""
+    return kind, payload
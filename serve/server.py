@@ -0,0 +1,420 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import tempfile
+import wave
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from nltk.tokenize import sent_tokenize
+from ollama import AsyncClient
+
+from hear.asr import transcribe_audio
+from scheduling import apply_stage, apply_to_process
+from serve import protocol
+from speak.speak import TextToSpeechStreamer
+
+
+class FairQueue:
+    """Per-session FIFO queues served round-robin, so no session can starve another"""
+
+    def __init__(self):
+        self._queues = OrderedDict()
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def put(self, key, item):
+        self._queues.setdefault(key, deque()).append(item)
+
+    def take(self, count):
+        """Pop up to count items, at most one per session per round"""
+        items = []
+        while self._queues and len(items) < count:
+            for key in list(self._queues):
+                if len(items) >= count:
+                    break
+                queue = self._queues[key]
+                items.append(queue.popleft())
+                # Served sessions go to the back of the line
+                self._queues.move_to_end(key)
+                if not queue:
+                    del self._queues[key]
+        return items
+
+
+# Repo root, so the worker can be started with python -m hear.asr_worker
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_wav(pcm):
+    """Write PCM to a temporary WAV file and return its path"""
+    fd, wav_file = tempfile.mkstemp(suffix=".wav")
+    with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(protocol.SAMPLE_WIDTH)
+        wav.setframerate(protocol.SAMPLE_RATE)
+        wav.writeframes(pcm)
+    return wav_file
+
+
+class ASRWorker:
+    """
+    One long-lived hear.asr_worker process with the Whisper model loaded.
+
+    Started on first use and restarted if it dies. If it cannot start at all
+    (e.g. the model fails to load), it is marked unavailable and the caller
+    falls back to one transcribe_audio process per utterance.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.unavailable = False
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "hear.asr_worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=REPO_ROOT,
+        )
+        apply_to_process("asr", self.process.pid)
+        # The worker answers once the model is loaded
+        if not await self.process.stdout.readline():
+            self.process = None
+            self.unavailable = True
+            raise RuntimeError("ASR worker exited while loading the model")
+
+    async def transcribe_batch(self, wav_files):
+        if self.process is None or self.process.returncode is not None:
+            await self.start()
+        self.process.stdin.write((json.dumps(wav_files) + "\n").encode())
+        await self.process.stdin.drain()
+        line = await self.process.stdout.readline()
+        if not line:
+            # Crashed mid-batch; start a fresh one next time
+            self.process = None
+            raise RuntimeError("ASR worker exited during a batch")
+        return json.loads(line)
+
+
+class ASRBatcher:
+    """
+    Shares the ASR backend across sessions.
+
+    Each worker process keeps the model loaded and, whenever it is idle,
+    takes up to max_batch queued utterances round-robin across sessions and
+    transcribes them in one request. Under load utterances from several
+    sessions share a pass; when idle a lone utterance goes straight through,
+    with no batching window to wait for. useful_transformers decodes one file
+    at a time, so a batch saves process and model start-up, not decode time.
+    """
+
+    def __init__(self, workers=1, max_batch=4):
+        self.max_batch = max_batch
+        self.pending = FairQueue()
+        self.workers = [ASRWorker() for _ in range(workers)]
+        self.fallback_executor = ThreadPoolExecutor(max_workers=workers)
+        self._wakeup = asyncio.Event()
+
+    async def transcribe(self, session_id, pcm):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.put(session_id, (pcm, future))
+        self._wakeup.set()
+        return await future
+
+    async def _next_batch(self):
+        while True:
+            while not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            # Sessions that left while queued are not transcribed for nobody
+            batch = [(pcm, future) for pcm, future in self.pending.take(self.max_batch)
+                     if not future.cancelled()]
+            if batch:
+                return batch
+
+    async def _transcribe_fallback(self, wav_files):
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *(loop.run_in_executor(self.fallback_executor, transcribe_audio, wav_file)
+              for wav_file in wav_files),
+            return_exceptions=True,
+        )
+
+    async def _serve(self, worker):
+        while True:
+            batch = await self._next_batch()
+            wav_files = [write_wav(pcm) for pcm, _ in batch]
+            try:
+                if worker.unavailable:
+                    results = await self._transcribe_fallback(wav_files)
+                else:
+                    try:
+                        results = await worker.transcribe_batch(wav_files)
+                    except Exception as e:
+                        print(f"ASR worker failed ({e}), "
+                              f"falling back to one process per utterance")
+                        results = await self._transcribe_fallback(wav_files)
+            finally:
+                # transcribe_audio deletes its own input; the worker does not
+                for wav_file in wav_files:
+                    if os.path.exists(wav_file):
+                        os.remove(wav_file)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def run(self):
+        await asyncio.gather(*(self._serve(worker) for worker in self.workers))
+
+    def close(self):
+        for worker in self.workers:
+            if worker.process is not None and worker.process.returncode is None:
+                worker.process.terminate()
+
+
+class Session:
+    """One connected client: its pending utterance and bounded outbound queue"""
+
+    def __init__(self, session_id, writer, max_utterance_bytes, outbox_size=8):
+        self.id = session_id
+        self.writer = writer
+        self.max_utterance_bytes = max_utterance_bytes
+        self.utterance = bytearray()
+        self.overflow_bytes = 0
+        # Bounded so a slow client stalls only its own turn
+        self.outbox = asyncio.Queue(maxsize=outbox_size)
+        self.closed = False
+
+    def append_audio(self, pcm):
+        free = self.max_utterance_bytes - len(self.utterance)
+        if len(pcm) > free:
+            self.overflow_bytes += len(pcm) - free
+            pcm = pcm[:free]
+        self.utterance += pcm
+
+    def take_utterance(self):
+        pcm = bytes(self.utterance)
+        self.utterance.clear()
+        self.overflow_bytes = 0
+        return pcm
+
+    async def send(self, kind, payload=b""):
+        if self.closed:
+            return
+        await self.outbox.put(protocol.encode_frame(kind, payload))
+
+    async def send_loop(self):
+        while True:
+            frame = await self.outbox.get()
+            if frame is None:
+                break
+            if self.writer.is_closing():
+                self.closed = True
+            if self.closed:
+                # Keep draining so senders never block on a dead client
+                continue
+            try:
+                self.writer.write(frame)
+                await self.writer.drain()
+            except ConnectionError:
+                self.closed = True
+
+
+class LunaServer:
+    """
+    Serves many voice clients from one process over plain TCP.
+
+    Each session sends PCM and an END frame per utterance. Transcription is
+    batched across sessions on long-lived ASR workers that keep the model
+    loaded, while LLM and TTS requests share bounded slots on the ollama and
+    paroli backends.
+    """
+
+    def __init__(self, model="luna:latest", max_utterance_seconds=30,
+                 asr_workers=1, asr_batch=4,
+                 llm_slots=1, tts_slots=2):
+        self.model = model
+        self.max_utterance_bytes = int(
+            max_utterance_seconds * protocol.SAMPLE_RATE * protocol.SAMPLE_WIDTH
+        )
+        self.asr = ASRBatcher(workers=asr_workers, max_batch=asr_batch)
+        self.ollama = AsyncClient()
+        self.tts = TextToSpeechStreamer()
+        self.tts_executor = ThreadPoolExecutor(
+            max_workers=tts_slots, initializer=apply_stage, initargs=("tts",)
+        )
+        # asyncio semaphores wake waiters in FIFO order
+        self.llm_slots = asyncio.Semaphore(llm_slots)
+        self.tts_slots = asyncio.Semaphore(tts_slots)
+        self._session_ids = itertools.count(1)
+
+    async def speak_worker(self, session, sentences):
+        """Synthesize sentences for one session in order, one request in flight"""
+        loop = asyncio.get_running_loop()
+        while True:
+            sentence = await sentences.get()
+            if sentence is None or session.closed:
+                break
+            async with self.tts_slots:
+                audio = await loop.run_in_executor(
+                    self.tts_executor, self.tts.synthesize_bytes, sentence
+                )
+            if audio:
+                await session.send(protocol.AUDIO_OUT, audio)
+
+    async def run_turn(self, session):
+        if session.overflow_bytes:
+            print(f"Session {session.id}: utterance truncated, "
+                  f"dropped {session.overflow_bytes} bytes")
+        pcm = session.take_utterance()
+        if not pcm:
+            return
+
+        transcription = await self.asr.transcribe(session.id, pcm)
+        if not transcription:
+            await session.send(protocol.ERROR, b"No transcription found")
+            return
+        print(f"Session {session.id}: {transcription}")
+        await session.send(protocol.TEXT, transcription.encode())
+
+        # Unbounded, so a put never waits on the client: the LLM slot is held
+        # only while reading from ollama. One reply is at most a few KB of text.
+        sentences = asyncio.Queue()
+        speaker = asyncio.create_task(self.speak_worker(session, sentences))
+        try:
+            async with self.llm_slots:
+                stream = await self.ollama.chat(
+                    model=self.model,
+                    messages=[{'role': 'user', 'content': transcription}],
+                    stream=True,
+                )
+                text_accumulator = ""
+                async for chunk in stream:
+                    if session.closed:
+                        # Leaving the loop closes the ollama response
+                        break
+                    content = chunk['message']['content']
+                    text_accumulator += content
+                    if any(punct in content for punct in '.!?'):
+                        complete = sent_tokenize(text_accumulator)
+                        for sentence in complete[:-1]:
+                            if sentence.strip():
+                                sentences.put_nowait(sentence.strip())
+                        if len(complete) > 1:
+                            text_accumulator = complete[-1]
+
+            for sentence in sent_tokenize(text_accumulator):
+                if sentence.strip():
+                    sentences.put_nowait(sentence.strip())
+            sentences.put_nowait(None)
+            await speaker
+        finally:
+            speaker.cancel()
+
+    async def watch_peer(self, reader, session, turn):
+        """Cancel the running turn as soon as the client disconnects"""
+        while not (reader.at_eof() or session.writer.is_closing() or session.closed):
+            await asyncio.sleep(0.1)
+        session.closed = True
+        turn.cancel()
+
+    async def handle_client(self, reader, writer):
+        session = Session(next(self._session_ids), writer, self.max_utterance_bytes)
+        peer = writer.get_extra_info("peername")
+        print(f"Session {session.id} connected from {peer}")
+        sender = asyncio.create_task(session.send_loop())
+
+        try:
+            while True:
+                kind, payload = await protocol.read_frame(reader)
+                if kind == protocol.AUDIO_IN:
+                    session.append_audio(payload)
+                elif kind == protocol.END:
+                    # Turns run inline, so the next utterance is not read until
+                    # this one is answered: TCP applies backpressure to the client
+                    turn = asyncio.create_task(self.run_turn(session))
+                    watcher = asyncio.create_task(self.watch_peer(reader, session, turn))
+                    try:
+                        await turn
+                    except asyncio.CancelledError:
+                        if not session.closed:
+                            # The server itself is shutting down
+                            raise
+                        print(f"Session {session.id}: client left, turn cancelled")
+                        break
+                    except Exception as e:
+                        print(f"Session {session.id}: error during turn: {e}")
+                        await session.send(protocol.ERROR, str(e).encode())
+                    finally:
+                        watcher.cancel()
+                    # Every turn ends with DONE, including after an ERROR
+                    await session.send(protocol.DONE)
+                else:
+                    raise protocol.ProtocolError(f"Unexpected frame type {kind}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # Clean close or abrupt disconnect of the satellite
+            pass
+        except protocol.ProtocolError as e:
+            print(f"Session {session.id}: {e}")
+        finally:
+            await session.outbox.put(None)
+            await sender
+            writer.close()
+            print(f"Session {session.id} disconnected")
+
+    async def serve(self, host, port):
+        apply_stage("llm")
+        asr_dispatcher = asyncio.create_task(self.asr.run())
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Luna server listening on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            asr_dispatcher.cancel()
+            self.asr.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve several Luna voice clients from one process")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8849)
+    parser.add_argument("--model", default="luna:latest")
+    parser.add_argument("--max-utterance", type=float, default=30,
+                        help="Maximum utterance length in seconds")
+    parser.add_argument("--asr-workers", type=int, default=1,
+                        help="ASR worker processes, each with its own copy of the model")
+    parser.add_argument("--asr-batch", type=int, default=4,
+                        help="Maximum queued utterances sent to a worker in one pass")
+    parser.add_argument("--llm-slots", type=int, default=1,
+                        help="Concurrent ollama requests (match OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--tts-slots", type=int, default=2,
+                        help="Concurrent paroli requests")
+    args = parser.parse_args()
+
+    server = LunaServer(
+        model=args.model,
+        max_utterance_seconds=args.max_utterance,
+        asr_workers=args.asr_workers,
+        asr_batch=args.asr_batch,
+        llm_slots=args.llm_slots,
+        tts_slots=args.tts_slots,
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
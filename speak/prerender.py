@@ -0,0 +1,199 @@
+import argparse
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from speak.speak import TextToSpeechStreamer
+
+# Bump when the layout of the pack or its index changes
+PACK_VERSION = 1
+
+
+def load_prompts(input_path):
+    """
+    Load the prompts to pre-render.
+
+    Plain text files hold one sentence per line and use the sentence itself
+    as the clip key. JSONL files hold one object per line with a "text"
+    field and an optional "id" field used as the clip key.
+
+    Args:
+        input_path (str): Path to a .txt or .jsonl file
+
+    Returns:
+        list: (key, text) tuples in file order, exact duplicates removed
+
+    Raises:
+        ValueError: If a key is repeated with different text
+    """
+    prompts = []
+    seen = {}
+    is_jsonl = input_path.endswith(".jsonl")
+
+    with open(input_path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if is_jsonl:
+                record = json.loads(line)
+                if "text" not in record:
+                    raise ValueError(f"{input_path}:{line_number}: missing 'text' field")
+                text = record["text"].strip()
+                # The index is JSON, so keys come back as strings
+                key = str(record.get("id", text))
+            else:
+                text = line
+                key = line
+            if key in seen:
+                # Exact repeats are harmless; a reused key with new text is not
+                if seen[key] != text:
+                    raise ValueError(
+                        f"{input_path}:{line_number}: key {key!r} already used for different text"
+                    )
+                continue
+            seen[key] = text
+            prompts.append((key, text))
+
+    return prompts
+
+
+def render_pack(prompts, output_prefix, api_url=None, workers=4):
+    """
+    Synthesize all prompts concurrently and write them as one audio pack.
+
+    Writes <output_prefix>.pack, the encoded clips concatenated back to back,
+    and <output_prefix>.idx.json, the offset table mapping each key to its
+    (offset, length) inside the pack.
+
+    Args:
+        prompts (list): (key, text) tuples, as returned by load_prompts
+        output_prefix (str): Path prefix for the pack and index files
+        api_url (str): paroli synthesis endpoint, defaults to the streamer's
+        workers (int): Maximum number of requests in flight at once
+
+    Returns:
+        list: Keys that failed to synthesize
+    """
+    if api_url:
+        tts_streamer = TextToSpeechStreamer(api_url=api_url)
+    else:
+        tts_streamer = TextToSpeechStreamer()
+
+    texts = [text for _, text in prompts]
+    print(f"Rendering {len(texts)} prompts with {workers} workers...")
+
+    # map() keeps results in input order, so the pack layout is deterministic
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(tts_streamer.synthesize_bytes, texts))
+
+    pack_path = f"{output_prefix}.pack"
+    index_path = f"{output_prefix}.idx.json"
+    clips = {}
+    failed = []
+    offset = 0
+
+    with open(pack_path, "wb") as pack:
+        for (key, text), audio in zip(prompts, results):
+            if not audio:
+                print(f"✗ Failed to synthesize: {text}")
+                failed.append(key)
+                continue
+            pack.write(audio)
+            clips[key] = [offset, len(audio)]
+            offset += len(audio)
+
+    index = {
+        "version": PACK_VERSION,
+        "format": "opus",
+        "size": offset,
+        "clips": clips,
+    }
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+
+    print(f"Wrote {len(clips)} clips ({offset} bytes) to {pack_path}")
+    print(f"Wrote offset table to {index_path}")
+    return failed
+
+
+class AudioPack:
+    """
+    Read-only view of a pre-rendered audio pack.
+
+    The pack is memory-mapped once on open, so fetching a clip copies its
+    bytes out of the mapping: no synthesis and no per-clip file opens.
+    """
+
+    def __init__(self, output_prefix):
+        with open(f"{output_prefix}.idx.json", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != PACK_VERSION:
+            raise ValueError(f"Unsupported pack version: {index.get('version')}")
+
+        self.clips = {key: tuple(entry) for key, entry in index["clips"].items()}
+        self._file = open(f"{output_prefix}.pack", "rb")
+        pack_size = os.fstat(self._file.fileno()).st_size
+        if pack_size != index["size"]:
+            self._file.close()
+            raise ValueError(
+                f"{output_prefix}.pack is {pack_size} bytes, index expects {index['size']}"
+            )
+        if index["size"]:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # mmap refuses zero-length files
+            self._map = b""
+
+    def __contains__(self, key):
+        return str(key) in self.clips
+
+    def get(self, key):
+        """Return the encoded audio for key as bytes, or None"""
+        entry = self.clips.get(str(key))
+        if entry is None:
+            return None
+        offset, length = entry
+        # A copy rather than a memoryview, so close() never sees exported pointers
+        return self._map[offset:offset + length]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-render a fixed set of prompts into an indexed audio pack"
+    )
+    parser.add_argument("input", help="Text file (one sentence per line) or JSONL file")
+    parser.add_argument("output", help="Output path prefix for the .pack and .idx.json files")
+    parser.add_argument("--api-url", default=None, help="paroli synthesis endpoint")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Maximum number of concurrent synthesis requests")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    prompts = load_prompts(args.input)
+    failed = render_pack(prompts, args.output, api_url=args.api_url, workers=args.workers)
+    if failed:
+        print(f"{len(failed)} prompts failed to synthesize")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ import threading
 import queue
 from nltk.tokenize import sent_tokenize
 
+from scheduling import apply_stage, run_in_stage
+
 # Check and download nltk data if needed
 try:
     nltk.data.find('tokenizers/punkt')
@@ -23,8 +25,8 @@ class TextToSpeechStreamer:
         self.current_index = 0
         self.total_sentences = 0
         
-    def synthesize_sentence(self, sentence, index):
-        """Convert a single sentence to speech"""
+    def synthesize_bytes(self, sentence):
+        """Convert a single sentence to speech and return the encoded audio"""
         try:
             payload = {"text": sentence.strip()}
             response = requests.post(
@@ -34,11 +36,7 @@ class TextToSpeechStreamer:
             )
             
             if response.status_code == 200:
-                output_file = f"temp_{index}.opus"
-                with open(output_file, 'wb') as f:
-                    f.write(response.content)
-                print(f"✓ Synthesized sentence {index + 1}/{self.total_sentences}")
-                return output_file
+                return response.content
             else:
                 print(f"Error synthesizing speech: {response.status_code}")
                 return None
@@ -46,10 +44,22 @@ class TextToSpeechStreamer:
             print(f"Exception during synthesis: {e}")
             return None
 
+    def synthesize_sentence(self, sentence, index):
+        """Convert a single sentence to speech"""
+        audio = self.synthesize_bytes(sentence)
+        if audio is None:
+            return None
+        output_file = f"temp_{index}.opus"
+        with open(output_file, 'wb') as f:
+            f.write(audio)
+        print(f"✓ Synthesized sentence {index + 1}/{self.total_sentences}")
+        return output_file
+
     def play_audio(self, file_path):
         """Play the audio file using ffplay"""
         try:
-            subprocess.run(
+            run_in_stage(
+                "playback",
                 ['ffplay', '-nodisp', '-autoexit', '-hide_banner', file_path],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
@@ -59,8 +69,24 @@ class TextToSpeechStreamer:
             print(f"Error playing audio: {e}")
             return False
 
+    def play_audio_bytes(self, audio):
+        """Play in-memory audio by piping it to ffplay's stdin"""
+        try:
+            run_in_stage(
+                "playback",
+                ['ffplay', '-nodisp', '-autoexit', '-hide_banner', '-i', 'pipe:0'],
+                input=bytes(audio),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            return True
+        except Exception as e:
+            print(f"Error playing audio: {e}")
+            return False
+
     def synthesis_worker(self, sentences):
         """Worker thread for synthesizing sentences"""
+        apply_stage("tts")
         for i, sentence in enumerate(sentences):
             if not self.is_running:
                 break
@@ -179,6 +205,7 @@ class StreamToSpeech:
 
     def speech_worker(self):
         """Worker thread to process sentences and convert them to speech"""
+        apply_stage("tts")
         while self.is_running:
             try:
                 # Get a sentence from the queue, wait up to 1 second